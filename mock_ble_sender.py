@@ -1,122 +1,224 @@
-import json
+#!/usr/bin/env python3
+"""
+mock_ble_sender.py
+
+模拟开发板，随机发送普通信标 / MBT02 中继帧 / MBT02 组合帧。
+
+消息以 orjson 编码后的 bytes 直接发送，即 WebSocket 二进制帧（内容仍是 UTF-8 JSON），
+接收端省去一次 UTF-8 校验；服务端需同时接受 binary/text 帧。
+若服务端只接受 text 帧，将 BINARY_FRAMES 设为 False。
+
+Usage:
+    python3 mock_ble_sender.py
+"""
+
+import os
 import random
+import orjson
 import websockets
 import asyncio
 
+try:
+    import uvloop
+except ImportError:  # uvloop 可选（Windows 不支持），未安装时使用默认事件循环
+    uvloop = None
+
 WS_URL = "ws://127.0.0.1:8080/"
+SEND_INTERVAL = 1.0   # 秒，每条消息的生成间隔
+BINARY_FRAMES = True  # False 时 decode 为 str 以 text 帧发送
+
+# 批量发送：攒够 BATCH_SIZE 条或等待超过 BATCH_FLUSH 秒即合并为一帧发送。
+# BATCH_SIZE = 1 时保持逐条发送单个 JSON 对象；>1 时帧内容为 JSON 数组（服务端需按数组解析）。
+BATCH_SIZE = 1
+BATCH_FLUSH = 0.05    # 秒
+
+# DEBUG = True 时逐帧打印发送内容；否则每 STAT_INTERVAL 秒只打印一次发送速率，
+# 避免高频发送时同步 stdout 写阻塞事件循环
+DEBUG = False
+STAT_INTERVAL = 1.0   # 秒
+
+# 并发客户端数：>1 时在同一事件循环中并发运行多个发送协程，各自持有独立连接（压测前端用）
+CLIENTS = 1
 
 # -------------------------------------------------------
 # 工具函数
 # -------------------------------------------------------
 
+# 随机字节统一用 os.urandom 一次取出再整体转十六进制，避免逐字节 randint + 格式化；
+# 标量字段用 random.randint（单次调用开销远低于 NumPy Generator）
+
 # prefix = "C3:00:00:30"
 def random_mac(prefix=""):
-    return f"{prefix}:{random.randint(0,255):02X}:{random.randint(0,255):02X}"
+    return f"{prefix}:{os.urandom(2).hex(':').upper()}"
 
 def random_raw_hex(n):
-    return " ".join(f"{random.randint(0,255):02X}" for _ in range(n))
+    return os.urandom(n).hex(" ").upper()
+
+def pack_batch(frames):
+    """
+    单条直接返回；多条拼接为 JSON 数组（元素已是 orjson bytes，无需再次编码）。
+    """
+    if len(frames) == 1:
+        return frames[0]
+    return b"[" + b",".join(frames) + b"]"
 
 # -------------------------------------------------------
 # 普通信标（不属于 MBT02/MWC01）
 # -------------------------------------------------------
 
+# 帧结构固定，预编码为 bytes 模板，发送时只填入变化字段（mac, rssi, data）
+_BEACON_TEMPLATE = (
+    b'{"raw":{"mac":"%b","rssi":%d,"len":10,"data":"%b","type":"beacon"},'
+    b'"parsed":null}'
+)
+
 def build_beacon_json():
     mac = random_mac("C3:00:00:24")
-    return json.dumps({
-        "raw": {
-            "mac": mac,
-            "rssi": random.randint(-85, -30),
-            "len": 10,
-            "data": random_raw_hex(10),
-            "type": "beacon"
-        },
-        "parsed": None
-    })
+    return _BEACON_TEMPLATE % (
+        mac.encode(),
+        random.randint(-85, -30),
+        random_raw_hex(10).encode()
+    )
 
 # -------------------------------------------------------
 # MBT02 中继帧（FrameVersion = 0x1A, Usage = 0x01）
 # -------------------------------------------------------
 
+# len = 27: MBT02 relay frame length; usage: MBT02 => 必须固定为 0x01
+_RELAY_TEMPLATE = (
+    b'{"raw":{"mac":"%b","rssi":%d,"len":27,"data":"%b"},'
+    b'"parsed":{"type":"relay","vendor":1,"usage":1,"serial":%d,"count":%d,"relays":%b}}'
+)
+
 def build_relay_json_mbt02():
     mac = random_mac("C3:00:00:30")
 
-    relay_list = []
     count = random.randint(1, 4)
-
-    for i in range(count):
-        tail = f"{random.randint(0,255):02X}:{random.randint(0,255):02X}:{random.randint(0,255):02X}"
-        relay_list.append({
-            "idx": i,
-            "tail": tail,
-            "rssi": random.randint(-90, -40)
-        })
-
-    return json.dumps({
-        "raw": {
-            "mac": mac,
-            "rssi": random.randint(-80, -40),
-            "len": 27,                    # MBT02 relay frame length
-            "data": random_raw_hex(27)
-        },
-        "parsed": {
-            "type": "relay",
-            "vendor": 1,
-            "usage": 1,                  # MBT02 => 必须固定为 0x01
-            "serial": random.randint(0, 255),
-            "count": count,
-            "relays": relay_list
-        }
-    })
+    # 所有 tail 一次取字节并整体转 "XX:XX:XX:XX:..."，每个 tail 占 8 字符、步长 9
+    tails = os.urandom(3 * count).hex(":").upper()
+
+    relay_list = [
+        {"idx": i, "tail": tails[9 * i:9 * i + 8], "rssi": random.randint(-90, -40)}
+        for i in range(count)
+    ]
+
+    return _RELAY_TEMPLATE % (
+        mac.encode(),
+        random.randint(-80, -40),
+        random_raw_hex(27).encode(),
+        random.randint(0, 255),
+        count,
+        orjson.dumps(relay_list)
+    )
 
 # -------------------------------------------------------
 # MBT02 组合帧（FrameVersion = 0x03, BlockID = 0x22）
 # -------------------------------------------------------
 
+# len = 23: MBT02 combo frame length; parsed.mac 为内嵌 MAC; product = 0x0008; tamper 来自 BlockID 0x22
+_COMBO_TEMPLATE = (
+    b'{"raw":{"mac":"%b","rssi":%d,"len":23,"data":"%b"},'
+    b'"parsed":{"type":"combo","vendor":1,"mac":"%b","battery":%d,"product":8,"tamper":%d}}'
+)
+
 def build_combo_json_mbt02():
     mac = random_mac("C3:00:00:30")
 
-    inner_mac = ":".join(f"{random.randint(0,255):02X}" for _ in range(6))
-
-    return json.dumps({
-        "raw": {
-            "mac": mac,
-            "rssi": random.randint(-75, -35),
-            "len": 23,                 # MBT02 combo frame length
-            "data": random_raw_hex(23)
-        },
-        "parsed": {
-            "type": "combo",
-            "vendor": 1,
-            "mac": inner_mac,         # 内嵌 MAC
-            "battery": random.randint(20, 100),
-            "product": 0x0008,
-            "tamper": random.randint(0, 1)  # BlockID 0x22
-        }
-    })
+    inner_mac = os.urandom(6).hex(":").upper()
+
+    return _COMBO_TEMPLATE % (
+        mac.encode(),
+        random.randint(-75, -35),
+        random_raw_hex(23).encode(),
+        inner_mac.encode(),
+        random.randint(20, 100),
+        random.randint(0, 1)
+    )
 
 # -------------------------------------------------------
 # 主发送逻辑
 # -------------------------------------------------------
 
-async def main():
-    async with websockets.connect(WS_URL) as ws:
-        print("模拟开发板已连接。开始发送 MBT02 + Beacon 数据...\n")
-
-        while True:
-            t = random.randint(0, 2)
-
-            if t == 0:
-                payload = build_beacon_json()
-            elif t == 1:
-                payload = build_relay_json_mbt02()
-            else:
-                payload = build_combo_json_mbt02()
-
-            await ws.send(payload)
-            print("Sent:\n", payload, "\n")
-
-            await asyncio.sleep(1)
+def build_random_json():
+    """
+    随机选择一种帧类型（普通信标 / MBT02 中继帧 / MBT02 组合帧）并构建。
+    """
+    t = random.randint(0, 2)
+
+    if t == 0:
+        return build_beacon_json()
+    elif t == 1:
+        return build_relay_json_mbt02()
+    else:
+        return build_combo_json_mbt02()
+
+async def send_frames(ws, frames, interval):
+    """
+    按 interval 周期从 frames 迭代器取消息并通过 ws 发送（mock_locate_sender 共用）。
+    攒够 BATCH_SIZE 条或首条等待超过 BATCH_FLUSH 秒即合并为一帧发送，
+    每 STAT_INTERVAL 秒打印一次发送速率；frames 耗尽时发出剩余批次后返回。
+    """
+    loop = asyncio.get_running_loop()
+    batch = []
+    batch_start = 0.0
+    sent = 0
+    stat_start = loop.time()
+    # 按单调时钟的绝对截止时间调度，sleep 扣除本轮耗时，避免发送周期累积漂移
+    next_t = loop.time()
+
+    async def flush():
+        nonlocal sent
+        frame = pack_batch(batch)
+        sent += len(batch)
+        batch.clear()
+        await ws.send(frame if BINARY_FRAMES else frame.decode())
+        if DEBUG:
+            print("[WS] Sent:", frame)
+
+    for msg in frames:
+        if not batch:
+            batch_start = loop.time()
+        batch.append(msg)
+
+        if len(batch) >= BATCH_SIZE or loop.time() - batch_start >= BATCH_FLUSH:
+            await flush()
+
+        now = loop.time()
+        if now - stat_start >= STAT_INTERVAL:
+            print(f"[WS] Sent {sent} msgs in {now - stat_start:.1f}s")
+            sent = 0
+            stat_start = now
+
+        next_t += interval
+        # 未满的批次最多等待 BATCH_FLUSH：超时点早于下一条消息时先睡到超时点并发送
+        if batch and batch_start + BATCH_FLUSH < next_t:
+            await asyncio.sleep(max(0.0, batch_start + BATCH_FLUSH - loop.time()))
+            await flush()
+        # 落后于计划时 sleep(0)，仍让出事件循环给其他协程
+        await asyncio.sleep(max(0.0, next_t - loop.time()))
+
+    if batch:
+        await flush()
+
+async def main(uri=WS_URL):
+    # 每个客户端各自捕获连接异常，main_n 并发压测时单个连接失败不影响其余客户端
+    try:
+        # 帧只有几百字节且服务端在本机，关闭 permessage-deflate，省去每帧一次 zlib 压缩
+        async with websockets.connect(uri, compression=None) as ws:
+            print("模拟开发板已连接。开始发送 MBT02 + Beacon 数据...\n")
+            await send_frames(ws, iter(build_random_json, None), SEND_INTERVAL)
+    except ConnectionRefusedError:
+        print(f"[WS] Connection refused: cannot connect to {uri}. Is the server running?")
+    except Exception as e:
+        print("[WS] Exception:", e)
+
+
+async def main_n(n, uri=WS_URL):
+    await asyncio.gather(*[main(uri) for _ in range(n)])
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main_n(CLIENTS))
+    else:
+        asyncio.run(main_n(CLIENTS))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+mock_combined_sender.py
+
+在同一进程内同时运行 mock_ble_sender 与 mock_locate_sender 的消息生成：
+两个生产者协程把消息放入共享的 asyncio.Queue，由唯一的 writer 协程通过一条
+WebSocket 连接发出（单连接、单写者）。
+
+writer 每次取到消息后，会把队列中已就绪的消息一并取出（最多 BATCH_SIZE 条）合并为一帧；
+BATCH_SIZE = 1 时仍逐条发送单个 JSON 对象。帧格式与两个独立脚本一致（默认二进制帧）。
+
+Usage:
+    python3 mock_combined_sender.py
+"""
+
+import asyncio
+import websockets
+
+import mock_ble_sender as ble
+import mock_locate_sender as locate
+
+# WS_URL、发送间隔、BINARY_FRAMES、DEBUG、STAT_INTERVAL 等沿用两个脚本中的定义
+QUEUE_SIZE = 256      # 发送队列上限，writer 跟不上时生产者在 put 处等待
+
+# 合并发送：每帧最多合并的已就绪消息数；>1 时帧内容为 JSON 数组（服务端需按数组解析）
+BATCH_SIZE = 1
+
+# --------------------------------
+
+async def producer(frames, out_q, interval):
+    """
+    按 interval 周期从 frames 迭代器取消息放入 out_q（单调时钟截止时间调度）。
+    """
+    loop = asyncio.get_running_loop()
+    next_t = loop.time()
+    for msg in frames:
+        await out_q.put(msg)
+        next_t += interval
+        await asyncio.sleep(max(0.0, next_t - loop.time()))
+
+async def writer(ws, out_q):
+    """
+    唯一写者：取出队列中的消息，顺带取走已就绪的其余消息合并为一帧发送。
+    """
+    loop = asyncio.get_running_loop()
+    sent = 0
+    stat_start = loop.time()
+    while True:
+        batch = [await out_q.get()]
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(out_q.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        frame = ble.pack_batch(batch)
+        sent += len(batch)
+        await ws.send(frame if ble.BINARY_FRAMES else frame.decode())
+        if ble.DEBUG:
+            print(f"[WS] Sent: {frame}")
+
+        now = loop.time()
+        if now - stat_start >= ble.STAT_INTERVAL:
+            print(f"[WS] Sent {sent} msgs in {now - stat_start:.1f}s")
+            sent = 0
+            stat_start = now
+
+async def main(uri=ble.WS_URL):
+    locate_frames = locate.iter_relay_located()
+    if locate_frames is None:
+        print("No waypoints defined. Exiting.")
+        return
+
+    out_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    ble_frames = iter(ble.build_random_json, None)
+
+    try:
+        async with websockets.connect(uri, compression=None) as ws:
+            print(f"[WS] connected to {uri}. Sending BLE + RelayLocated ...")
+            await asyncio.gather(
+                producer(ble_frames, out_q, ble.SEND_INTERVAL),
+                producer(locate_frames, out_q, locate.SEND_INTERVAL),
+                writer(ws, out_q)
+            )
+    except ConnectionRefusedError:
+        print(f"[WS] Connection refused: cannot connect to {uri}. Is the server running?")
+    except Exception as e:
+        print("[WS] Exception:", e)
+
+if __name__ == "__main__":
+    if ble.uvloop is not None:
+        ble.uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -5,21 +5,38 @@ mock_locate_sender.py
 固定发送 relay_mac = C3:00:00:30:94:F9 的 RelayLocated 消息，
 设备沿着定义的路径（waypoints）匀速移动并周期发送位置。
 
+消息以 orjson 编码后的 bytes 直接发送，即 WebSocket 二进制帧（内容仍是 UTF-8 JSON），
+接收端省去一次 UTF-8 校验；服务端需同时接受 binary/text 帧。
+若服务端只接受 text 帧，将 mock_ble_sender.BINARY_FRAMES 设为 False。
+
 Usage:
     python3 mock_locate_sender.py
 """
 
-import json
-import random
+import orjson
 import asyncio
+import itertools
 import websockets
 import time
-import math
+
+import numpy as np
+
+import mock_ble_sender as ble
+
+try:
+    import uvloop
+except ImportError:  # uvloop 可选（Windows 不支持），未安装时使用默认事件循环
+    uvloop = None
 
 WS_URL = "ws://127.0.0.1:8080/"
 SEND_INTERVAL = 1.0   # 秒，发送频率（每秒发送一次）
 RELAY_MAC = "C3:00:00:30:94:F9"
 
+# 批量发送 / 二进制帧 / DEBUG 打印等发送配置与发送循环共用 mock_ble_sender 中的定义
+
+# 并发客户端数：>1 时在同一事件循环中并发运行多个发送协程，各自持有独立连接（压测前端用）
+CLIENTS = 1
+
 # 固定网关（示例 gmacs），发送时 anchors 会基于当前位置生成与位置相关的 distance/rssi
 GATEWAY_PREFIXES = [
     "A0:11:22:33:44",
@@ -68,118 +85,149 @@ NOISE_RSSI = 2     # RSSI 随机波动（dB）
 
 # --------------------------------
 
-def build_anchors_from_pos(x, y, num_anchors=4):
+# 给每个网关设置一个固定坐标（用于模拟距离）
+# 这里把网关按索引放在场地四角附近（可调整）
+_GW_POS = np.array([
+    [0.0, 0.0],
+    [20.0, 0.0],
+    [20.0, 10.0],
+    [0.0, 10.0]
+], dtype=np.float64)
+
+# gmac 只与索引有关，导入时预先生成，避免每次发送重复格式化
+# 增加随机尾巴保证 MAC 唯一感
+_GMACS = tuple(
+    f"{GATEWAY_PREFIXES[i % len(GATEWAY_PREFIXES)]}:{(i*11)%256:02X}:{(i*37)%256:02X}"
+    for i in range(len(_GW_POS))
+)
+
+_rng = np.random.default_rng()
+
+def build_anchor_tables(points):
+    """
+    预计算轨迹上每个点到各网关的距离与基准 rssi（不含噪声）。
+    输入 points shape = (N, 2)，返回 (dist, base_rssi)，shape 均为 (N, 网关数)。
+    发送时只需叠加随机噪声，hypot/log10 不再出现在发送循环中。
+    """
+    dist = np.hypot(
+        points[:, None, 0] - _GW_POS[None, :, 0],
+        points[:, None, 1] - _GW_POS[None, :, 1]
+    )
+    # 简单经验模型将 distance -> rssi（不是精确传播模型，仅用于 mock）
+    # rssi = A - 20*log10(distance)
+    base_rssi = -30 - 20 * np.log10(np.maximum(dist, 0.1) + 0.01)
+    return dist, base_rssi
+
+# RelayLocated 消息模板：结构固定，每次发送只原地改写变化字段后直接 orjson 编码，
+# 不再为每条消息重新分配 payload/anchors 的 dict 与 list。
+# 修改与编码之间没有 await，多个发送协程共用同一模板也是安全的。
+_TEMPLATE = {
+    "cmd": "RelayLocated",
+    "relay_mac": RELAY_MAC,
+    "dev_type": "MBT02",
+    "x": 0.0,
+    "y": 0.0,
+    "rssi": 0,
+    "anchors": [{"gmac": g, "distance": 0.0, "rssi": 0} for g in _GMACS],
+    "timestamp": 0
+}
+
+def fill_anchors(anchors, dist, base_rssi):
     """
-    基于当前 (x,y) 生成 anchors 列表（包含 gmac, distance, rssi）。
-    distance 与 (x,y) 有关联，rssi 根据 distance 计算并加入噪声。
+    基于预计算的一行 distance/base_rssi 原地填充 anchors（gmac 固定，只改 distance, rssi）。
+    distance 加入 ±0.2m 抖动，rssi 加入 ±NOISE_RSSI 噪声。
     """
-    anchors = []
-    # 固定选择前 num_anchors 个 gateway（如果不够则随机生成尾部）
-    for i in range(num_anchors):
-        base = GATEWAY_PREFIXES[i % len(GATEWAY_PREFIXES)]
-        # 增加随机尾巴保证 MAC 唯一感
-        gmac = f"{base}:{(i*11)%256:02X}:{(i*37)%256:02X}"
-        # 给每个网关设置一个固定坐标（用于模拟距离）
-        # 这里把网关按索引放在场地四角附近（可调整）
-        gw_positions = [
-            (0.0, 0.0),
-            (20.0, 0.0),
-            (20.0, 10.0),
-            (0.0, 10.0)
-        ]
-        gwx, gwy = gw_positions[i % len(gw_positions)]
-        dx = x - gwx
-        dy = y - gwy
-        distance = math.hypot(dx, dy) + random.uniform(-0.2, 0.2)
-        if distance < 0.1:
-            distance = 0.1
-        # 简单经验模型将 distance -> rssi（不是精确传播模型，仅用于 mock）
-        # rssi = A - 20*log10(distance) (加上随机噪声)
-        rssi = int(round(-30 - 20 * math.log10(distance + 0.01) + random.uniform(-NOISE_RSSI, NOISE_RSSI)))
-        anchors.append({
-            "gmac": gmac,
-            "distance": round(distance, 2),
-            "rssi": rssi
-        })
-    return anchors
-
-def build_relay_located_at(x, y):
+    n = len(dist)
+    distance = np.maximum(dist + _rng.uniform(-0.2, 0.2, n), 0.1)
+    rssi = np.round(base_rssi + _rng.uniform(-NOISE_RSSI, NOISE_RSSI, n)).astype(int)
+    for anchor, d, r in zip(anchors, np.round(distance, 2).tolist(), rssi.tolist()):
+        anchor["distance"] = d
+        anchor["rssi"] = r
+
+def build_relay_located_at(x, y, dist, base_rssi):
     """
-    构建 RelayLocated JSON（字符串）。
+    构建 RelayLocated JSON（orjson 编码后的 bytes，ws.send 直接以二进制帧发出）。
+    dist/base_rssi 为当前点在 build_anchor_tables 结果中的对应行。
     """
-    payload = {
-        "cmd": "RelayLocated",
-        "relay_mac": RELAY_MAC,
-        "dev_type": "MBT02",
-        "x": round(x + random.uniform(-NOISE_POS, NOISE_POS), 3),
-        "y": round(y + random.uniform(-NOISE_POS, NOISE_POS), 3),
-        "rssi": random.randint(-100, -40),
-        "anchors": build_anchors_from_pos(x, y, num_anchors=4),
-        "timestamp": int(time.time() * 1000)
-    }
-    return json.dumps(payload, ensure_ascii=False)
+    # 位置抖动一次取两个值
+    jx, jy = _rng.uniform(-NOISE_POS, NOISE_POS, 2).tolist()
+    payload = _TEMPLATE
+    payload["x"] = round(x + jx, 3)
+    payload["y"] = round(y + jy, 3)
+    payload["rssi"] = int(_rng.integers(-100, -40, endpoint=True))
+    fill_anchors(payload["anchors"], dist, base_rssi)
+    payload["timestamp"] = time.time_ns() // 1_000_000
+    return orjson.dumps(payload)
 
 def interpolate_path(waypoints, steps_per_segment):
     """
-    将 waypoints 插值生成完整的轨迹点列表（包含起点）。
+    将 waypoints 插值生成完整的轨迹点数组（包含起点）。
     插值方式：每两个相邻点均匀插 steps_per_segment 步（不重复终点）。
-    返回一个点列表 [(x,y), ...]
+    返回 float64 数组，shape = (N, 2)，每行为 (x, y)。
     """
-    pts = []
     n = len(waypoints)
     if n == 0:
-        return pts
-    for idx in range(n - 1):
-        x0, y0 = waypoints[idx]
-        x1, y1 = waypoints[idx + 1]
-        for s in range(steps_per_segment):
-            t = s / steps_per_segment
-            xi = x0 + (x1 - x0) * t
-            yi = y0 + (y1 - y0) * t
-            pts.append((xi, yi))
+        return np.empty((0, 2), dtype=np.float64)
+    wp = np.asarray(waypoints, dtype=np.float64)
+    # 每段 [p0, p1) 上均匀取 steps_per_segment 个 t，一次性向量化计算
+    t = np.arange(steps_per_segment, dtype=np.float64) / steps_per_segment
+    seg = wp[:-1, None, :] + (wp[1:, None, :] - wp[:-1, None, :]) * t[None, :, None]
     # append last waypoint
-    pts.append(waypoints[-1])
-    return pts
+    return np.concatenate([seg.reshape(-1, 2), wp[-1:]])
 
-async def sender_loop(uri=WS_URL, interval=SEND_INTERVAL):
+def iter_relay_located():
+    """
+    按 WAYPOINTS 轨迹（LOOP 时为 ping-pong）无限循环生成 RelayLocated 消息（bytes）。
+    未定义 waypoints 时返回 None。
+    """
     path = interpolate_path(WAYPOINTS, STEPS_PER_SEGMENT)
-    if not path:
-        print("No waypoints defined. Exiting.")
-        return
+    if len(path) == 0:
+        return None
 
     # 如果 LOOP=True，实现往返循环（ping-pong）
-    sequence = path[:]
+    sequence = path
     if LOOP:
         # create ping-pong by appending reversed path excluding endpoints
-        rev = path[::-1]
-        # remove first and last to avoid duplicates
-        if len(path) > 1:
-            rev = rev[1:-1] if len(path) > 2 else []
-        sequence = path + rev
+        sequence = np.concatenate([path, path[-2:0:-1]])
+
+    # 轨迹启动时已全部确定，距离/基准 rssi 一次性算好
+    dist_table, rssi_table = build_anchor_tables(sequence)
+    # 每一步要用的 (x, y), dist 行, base_rssi 行 预先打包，发送循环用 cycle 迭代，无需取模索引
+    steps = itertools.cycle(list(zip(sequence.tolist(), dist_table, rssi_table)))
+    return (
+        build_relay_located_at(x, y, dist, base_rssi)
+        for (x, y), dist, base_rssi in steps
+    )
+
+async def sender_loop(uri=WS_URL, interval=SEND_INTERVAL):
+    frames = iter_relay_located()
+    if frames is None:
+        print("No waypoints defined. Exiting.")
+        return
 
     try:
-        async with websockets.connect(uri) as ws:
+        # 帧只有几百字节且服务端在本机，关闭 permessage-deflate，省去每帧一次 zlib 压缩
+        async with websockets.connect(uri, compression=None) as ws:
             print(f"[WS] connected to {uri}. Sending RelayLocated for {RELAY_MAC} ...")
-            step = 0
-            while True:
-                idx = step % len(sequence)
-                x, y = sequence[idx]
-                msg = build_relay_located_at(x, y)
-                await ws.send(msg)
-                print(f"[WS] Sent ({step}): {msg}")
-                step += 1
-                await asyncio.sleep(interval)
+            await ble.send_frames(ws, frames, interval)
     except ConnectionRefusedError:
         print(f"[WS] Connection refused: cannot connect to {uri}. Is the server running?")
     except Exception as e:
         print("[WS] Exception:", e)
 
+async def main_n(n, uri=WS_URL, interval=SEND_INTERVAL):
+    await asyncio.gather(*[sender_loop(uri, interval) for _ in range(n)])
+
 def main():
     print("Mock locate sender starting.")
     print(f"Relay MAC: {RELAY_MAC}")
     print(f"Waypoints: {WAYPOINTS}")
     print(f"Steps per segment: {STEPS_PER_SEGMENT}, Loop: {LOOP}, Interval: {SEND_INTERVAL}s")
-    asyncio.run(sender_loop())
+    print(f"Batch size: {ble.BATCH_SIZE}, Batch flush: {ble.BATCH_FLUSH}s, Debug: {ble.DEBUG}, Clients: {CLIENTS}")
+    if uvloop is not None:
+        uvloop.run(main_n(CLIENTS))
+    else:
+        asyncio.run(main_n(CLIENTS))
 
 if __name__ == "__main__":
     main()